@@ -2,24 +2,76 @@ import discord
 from discord.ext import commands
 import sqlite3
 import os
+import sys
+import glob
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
 import shutil
 import asyncio
 import configparser
 import time
-from datetime import datetime, timedelta
+import pathlib
+import contextvars
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+# Startup timing
+STARTUP_STARTED = time.perf_counter()
+startup_timings = {}
+
+def record_startup(step, started):
+    """Record how long a startup step took"""
+    startup_timings[step] = time.perf_counter() - started
+
+#-------------------------
+# Startup Functions
+#-------------------------
+def load_config(path="config.ini"):
+    """Read the configuration file"""
+    parser = configparser.ConfigParser()
+    parser.read(path)
+    return parser
+
+def parse_role_ids(raw):
+    """Parse a comma separated list of Discord role IDs"""
+    return [int(role_id.strip()) for role_id in raw.split(",") if role_id.strip()]
+
+def build_intents():
+    """Build the gateway intents the bot needs"""
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    return intents
 
 # Read configuration
-config = configparser.ConfigParser()
-config.read("config.ini")
+started = time.perf_counter()
+config = load_config()
+record_startup("config", started)
 
 # Bot configuration
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+started = time.perf_counter()
+intents = build_intents()
 bot = commands.Bot(command_prefix='!', intents=intents)
+record_startup("intents", started)
 
-# Cooldown tracking
-last_used = {}
+# Rate limit tracking: user ID -> [tokens, last refill time.monotonic()]
+rate_buckets = {}
+last_bucket_sweep = 0.0
+
+# Cost of the work done by the command currently running
+command_cost = contextvars.ContextVar("command_cost", default=0.0)
+command_started = contextvars.ContextVar("command_started", default=0.0)
+# Tokens taken up front when the command was let in, settled once it finishes
+command_reserved = contextvars.ContextVar("command_reserved", default=0.0)
+
+# Token cost of each kind of work a command can do
+COST_SNAPSHOT = 10.0    # Taking a fresh copy of the game database
+COST_QUERY = 2.0        # Querying the snapshot directly
+COST_CACHE_HIT = 0.5    # Answering from the snapshot caches
 
 # Configuration values
 ORIGINAL_DB = config.get("DATABASE", "Path", fallback="game.db")
@@ -29,22 +81,172 @@ MAX_STRUCTURES = int(config.get("LIMITS", "MaxStructures", fallback="5000"))
 NOTIFICATION_CHANNEL_ID = int(config.get("DISCORD", "NotificationChannelId", fallback="0"))
 COMMAND_COOLDOWN = int(config.get("LIMITS", "CommandCooldownMinutes", fallback="5"))
 INACTIVE_DAYS = int(config.get("LIMITS", "InactiveDays", fallback="30"))
-ALLOWED_ROLE_IDS = [int(role_id.strip()) for role_id in 
-                    config.get("DISCORD", "AllClanStructuresRoleIds", fallback="").split(",") 
-                    if role_id.strip()]
+RATE_LIMIT_TOKENS = float(config.get("LIMITS", "RateLimitTokens", fallback=str(COST_SNAPSHOT)))
+ROLE_RATE_LIMIT_MULTIPLIER = float(config.get("LIMITS", "RoleRateLimitMultiplier", fallback="2"))
+SNAPSHOT_MAX_AGE = int(config.get("LIMITS", "SnapshotMaxAgeSeconds", fallback="60"))
+CACHE_DB = config.get("DATABASE", "CachePath", fallback="AdminBot_cache.db")
+
+started = time.perf_counter()
+ALLOWED_ROLE_IDS = parse_role_ids(config.get("DISCORD", "AllClanStructuresRoleIds", fallback=""))
+record_startup("role ids", started)
+
+LOG_LEVEL = config.get("LOGGING", "Level", fallback="INFO").upper()
+LOG_FILE = config.get("LOGGING", "File", fallback="AdminBot.log")
+LOG_MAX_BYTES = int(float(config.get("LOGGING", "MaxFileSizeMB", fallback="5")) * 1024 * 1024)
+LOG_BACKUP_COUNT = int(config.get("LOGGING", "BackupCount", fallback="3"))
+LOG_DEBUG_SAMPLE_RATE = int(config.get("LOGGING", "DebugSampleRate", fallback="10"))
+
+#-------------------------
+# Logging
+#-------------------------
+# Message ID of the command currently running, so its log lines can be grouped
+correlation_id = contextvars.ContextVar("correlation_id", default="-")
+
+class CorrelationFilter(logging.Filter):
+    """Tag records with the correlation ID of the command that logged them"""
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+class DebugSampleFilter(logging.Filter):
+    """Keep one in every `rate` debug records that repeat the previous message from the same call site"""
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = max(rate, 1)
+        # Call site -> [last message, times it has been repeated]
+        self.last = {}
+    
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        key = (record.pathname, record.lineno)
+        message = record.getMessage()
+        last = self.last.get(key)
+        if last is None or last[0] != message:
+            self.last[key] = [message, 0]
+            return True
+        last[1] += 1
+        return last[1] % self.rate == 0
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "message": record.getMessage()
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logging():
+    """Send log records through a queue so a background thread does the writing"""
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)-8s [%(correlation_id)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+    handlers = [console_handler]
+    
+    if LOG_FILE:
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    
+    # Filters run on the calling side, so dropped records never reach the queue
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampleFilter(LOG_DEBUG_SAMPLE_RATE))
+    queue_handler.addFilter(CorrelationFilter())
+    
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(queue_handler)
+    logging.getLogger("discord").setLevel(max(logging.INFO, root.level))
+    
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+started = time.perf_counter()
+setup_logging()
+logger = logging.getLogger("AdminBot")
+record_startup("logging", started)
+
+# Snapshot tracking
+snapshot = {
+    "path": None,         # Temporary copy of the game database, taken only when a command needs one
+    "generation": 0,      # Bumped every time the game database is seen to have changed
+    "taken_at": 0.0,      # time.monotonic() of the last change check
+    "fingerprint": None,  # Change detection state of the game database for this generation
+    "caches": None,       # Structure, roster and name caches for this generation
+    "reports": {}         # Item index, census, etc. built on first use for this generation
+}
+snapshot_lock = None
+copy_readers = {}         # Snapshot copy path -> number of report builds still reading it
+prewarm_task = None
+data_version_conn = None
+
+#-------------------------
+# Record Types
+#-------------------------
+class Record:
+    """Compact record with a fixed set of fields, stored as a plain list in the sidecar cache"""
+    __slots__ = ()
+    
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+    
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+    
+    def to_row(self):
+        return [getattr(self, field) for field in self.__slots__]
+    
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+class CharacterRecord(Record):
+    """A clan member as shown by !clan"""
+    __slots__ = ("id", "name", "level", "rank", "guild_id", "online")
+
+class GuildRecord(Record):
+    """A clan and its structure count"""
+    __slots__ = ("id", "name", "structure_count")
+
+class OwnerRecord(Record):
+    """A structure owner (clan, solo player or orphan) with its activity"""
+    __slots__ = ("id", "kind", "name", "structure_count", "last_active", "member_count", "last_active_member")
+
+class ActorLoadRecord(Record):
+    """Followers and placeables held by one owner"""
+    __slots__ = ("id", "kind", "name", "followers", "placeables")
+
+class PlayerRecord(Record):
+    """Detailed player information as shown by !player"""
+    __slots__ = ("name", "level", "rank", "guild", "online", "alive", "killer", "last_seen", "position", "stats")
+
+def intern_name(name):
+    """Share one copy of names that repeat across caches and reports"""
+    return sys.intern(name) if name is not None else None
 
 #-------------------------
 # Database Helper Functions
 #-------------------------
-async def create_temp_db(source_db):
+async def create_temp_db(source_db, generation=None):
     """Create a temporary copy of the database"""
-    temp_db = f"{os.path.splitext(source_db)[0]}_temp.db"
+    base = os.path.splitext(source_db)[0]
+    temp_db = f"{base}_{generation}_temp.db" if generation is not None else f"{base}_temp.db"
     try:
-        shutil.copy2(source_db, temp_db)
-        print(f"Created temporary database: {temp_db}")
+        # Copy off the event loop so the bot stays responsive on large saves
+        await asyncio.to_thread(shutil.copy2, source_db, temp_db)
+        logger.info("Created temporary database: %s", temp_db)
         return temp_db
     except Exception as e:
-        print(f"Error creating temporary database: {e}")
+        logger.error("Error creating temporary database: %s", e)
         return source_db
 
 async def cleanup_temp_db(temp_db):
@@ -63,17 +265,601 @@ async def cleanup_temp_db(temp_db):
             
             if os.path.exists(temp_db) and "_temp.db" in temp_db:
                 os.remove(temp_db)
-                print(f"Removed temporary database: {temp_db}")
+                logger.info("Removed temporary database: %s", temp_db)
                 return True
             return True  # File doesn't exist, so we're good
         except Exception as e:
             attempt += 1
-            print(f"Error removing temporary database (attempt {attempt}/{max_attempts}): {e}")
+            logger.warning("Error removing temporary database (attempt %d/%d): %s", attempt, max_attempts, e)
             await asyncio.sleep(5)  # Wait longer between attempts
     
-    print(f"Failed to remove temporary database after {max_attempts} attempts.")
+    logger.error("Failed to remove temporary database after %d attempts.", max_attempts)
     return False
 
+#-------------------------
+# Change Detection Functions
+#-------------------------
+def read_change_counter(db_path):
+    """Read the file change counter from the SQLite database header"""
+    with open(db_path, "rb") as f:
+        header = f.read(100)
+    if len(header) < 100 or not header.startswith(b"SQLite format 3\x00"):
+        return None
+    return int.from_bytes(header[24:28], "big")
+
+def read_data_version(db_path):
+    """PRAGMA data_version from a long-lived read-only connection to the game database"""
+    global data_version_conn
+    try:
+        if data_version_conn is None:
+            uri = f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro"
+            data_version_conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return data_version_conn.execute("PRAGMA data_version").fetchone()[0]
+    except Exception as e:
+        logger.warning("Error reading data_version: %s", e)
+        if data_version_conn is not None:
+            data_version_conn.close()
+            data_version_conn = None
+        return None
+
+def get_db_fingerprint(db_path):
+    """Describe the on-disk state of the game database so unchanged saves can be detected"""
+    try:
+        fingerprint = [read_change_counter(db_path)]
+        for path in (db_path, f"{db_path}-wal"):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                fingerprint.extend([stat.st_size, stat.st_mtime_ns])
+            else:
+                fingerprint.extend([None, None])
+        
+        # WAL commits don't touch the header counter, data_version does see them
+        # (it only means something within one connection, so it isn't persisted)
+        data_version = read_data_version(db_path) if os.path.exists(f"{db_path}-wal") else None
+        return {"file": fingerprint, "data_version": data_version}
+    except Exception as e:
+        logger.warning("Error reading database fingerprint: %s", e)
+        return None
+
+#-------------------------
+# Sidecar Cache Functions
+#-------------------------
+# Bump when the layout of cached reports changes so old entries are ignored
+CACHE_FORMAT = 2
+
+def cache_key(fingerprint):
+    """Sidecar key for a database state (data_version is per connection and can't be reused)"""
+    return json.dumps([CACHE_FORMAT, fingerprint["file"]])
+
+def open_cache_db():
+    """Open the sidecar database that keeps derived results across restarts"""
+    conn = sqlite3.connect(CACHE_DB)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reports (
+            name TEXT PRIMARY KEY,
+            fingerprint TEXT,
+            data TEXT
+        )
+    """)
+    return conn
+
+def load_cached_report(name, fingerprint):
+    """Load a report saved for the same game database state, or None"""
+    if fingerprint is None:
+        return None
+    conn = None
+    try:
+        conn = open_cache_db()
+        row = conn.execute("SELECT fingerprint, data FROM reports WHERE name = ?", (name,)).fetchone()
+        if row is None or row[0] != cache_key(fingerprint):
+            return None
+        return json.loads(row[1])
+    except Exception as e:
+        logger.warning("Error loading %s from cache: %s", name, e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def save_cached_report(name, fingerprint, data):
+    """Save a report together with the game database state it was built from"""
+    if fingerprint is None:
+        return
+    conn = None
+    try:
+        conn = open_cache_db()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO reports (name, fingerprint, data) VALUES (?, ?, ?)",
+                         (name, cache_key(fingerprint), json.dumps(data)))
+    except Exception as e:
+        logger.warning("Error saving %s to cache: %s", name, e)
+    finally:
+        if conn:
+            conn.close()
+
+def encode_caches(caches):
+    """Convert the caches to JSON friendly types (JSON object keys must be strings)"""
+    return {
+        "guilds": [guild.to_row() for guild in caches["guilds"].values()],
+        "rosters": [[member.to_row() for member in members] for members in caches["rosters"].values()],
+        "names": caches["names"]
+    }
+
+def decode_caches(data):
+    """Inverse of encode_caches"""
+    guilds = {}
+    for row in data["guilds"]:
+        guild = GuildRecord.from_row(row)
+        guild.name = intern_name(guild.name)
+        guilds[guild.name] = guild
+    
+    rosters = {}
+    for rows in data["rosters"]:
+        members = [CharacterRecord.from_row(row) for row in rows]
+        rosters[members[0].guild_id] = members
+    
+    return {
+        "guilds": guilds,
+        "rosters": rosters,
+        "names": data["names"]
+    }
+
+#-------------------------
+# Snapshot Cache Functions
+#-------------------------
+def build_caches(db_path):
+    """Fill the structure, roster and name caches from a snapshot"""
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # Structure counts for every owner in one grouped pass
+        cursor.execute("""
+            SELECT b.owner_id, COUNT(bi.instance_id)
+            FROM buildings b
+            JOIN building_instances bi ON b.object_id = bi.object_id
+            GROUP BY b.owner_id
+        """)
+        structure_counts = dict(cursor.fetchall())
+        
+        # Clan name -> clan
+        cursor.execute("SELECT guildId, name FROM guilds")
+        guilds = {}
+        for guild_id, name in cursor.fetchall():
+            guilds[name] = GuildRecord(guild_id, intern_name(name), structure_counts.get(guild_id, 0))
+        
+        # Clan rosters with online status resolved the same way as get_clan_members
+        cursor.execute("""
+            SELECT 
+                c.id,
+                c.char_name,
+                c.level,
+                c.rank,
+                c.guild,
+                COALESCE(
+                    (SELECT a.online FROM account a WHERE a.id = c.playerId LIMIT 1),
+                    (SELECT a.online FROM account a WHERE a.user = c.playerId LIMIT 1),
+                    0
+                )
+            FROM characters c
+            WHERE c.guild IS NOT NULL
+            ORDER BY c.rank DESC, c.char_name ASC
+        """)
+        rosters = {}
+        for char_id, char_name, level, rank, guild_id, online in cursor.fetchall():
+            member = CharacterRecord(char_id, char_name, level, rank, guild_id, bool(online))
+            rosters.setdefault(guild_id, []).append(member)
+        
+        # Lower-cased character names in one string, one per line, for quick player lookups
+        cursor.execute("SELECT char_name FROM characters")
+        names = "\n".join(row[0].lower() for row in cursor.fetchall() if row[0])
+        
+        return {
+            "guilds": guilds,
+            "rosters": rosters,
+            "names": names
+        }
+    except Exception as e:
+        logger.error("Error in build_caches: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+async def take_snapshot_copy():
+    """Copy the game database for the current generation (snapshot lock must be held)"""
+    if snapshot["path"] is not None:
+        return snapshot["path"]
+    
+    # Only the command that triggers the copy pays for it
+    add_command_cost(COST_SNAPSHOT)
+    snapshot["path"] = await create_temp_db(ORIGINAL_DB, snapshot["generation"])
+    return snapshot["path"]
+
+async def refresh_snapshot(fingerprint):
+    """Start a new generation after the game database has changed"""
+    old_path = snapshot["path"]
+    
+    snapshot["generation"] += 1
+    snapshot["path"] = None
+    snapshot["taken_at"] = time.monotonic()
+    snapshot["fingerprint"] = fingerprint
+    snapshot["reports"] = {}
+    
+    # Derived caches survive restarts, only copy when they are missing for this state
+    caches = await asyncio.to_thread(load_cached_report, "caches", fingerprint)
+    if caches is not None:
+        caches = decode_caches(caches)
+        logger.info("Loaded caches from %s (generation %d)", CACHE_DB, snapshot["generation"])
+    else:
+        temp_db = await take_snapshot_copy()
+        caches = await asyncio.to_thread(build_caches, temp_db)
+        if caches is not None:
+            await asyncio.to_thread(save_cached_report, "caches", fingerprint, encode_caches(caches))
+    snapshot["caches"] = caches
+    
+    # Remove the previous copy once any in-flight reads have finished
+    if old_path and old_path != snapshot["path"]:
+        asyncio.create_task(retire_snapshot_copy(old_path))
+
+async def retire_snapshot_copy(path):
+    """Remove an old snapshot copy once no report build is reading it"""
+    while copy_readers.get(path):
+        await asyncio.sleep(1)
+    await cleanup_temp_db(path)
+
+def get_snapshot_lock():
+    """Lock guarding the snapshot, created on first use inside the event loop"""
+    global snapshot_lock
+    if snapshot_lock is None:
+        snapshot_lock = asyncio.Lock()
+    return snapshot_lock
+
+async def get_snapshot():
+    """Return the current snapshot, starting a new generation if the game database changed"""
+    # Callers arriving during a refresh wait for it instead of starting another
+    async with get_snapshot_lock():
+        age = time.monotonic() - snapshot["taken_at"]
+        if snapshot["generation"] > 0 and age < SNAPSHOT_MAX_AGE:
+            return snapshot
+        
+        fingerprint = await asyncio.to_thread(get_db_fingerprint, ORIGINAL_DB)
+        if fingerprint is not None and fingerprint == snapshot["fingerprint"]:
+            # Nothing has been saved since the last check, keep the current generation
+            snapshot["taken_at"] = time.monotonic()
+        else:
+            await refresh_snapshot(fingerprint)
+        return snapshot
+
+async def get_snapshot_path():
+    """Path of the snapshot copy, taking the copy first if this generation doesn't have one yet"""
+    async with get_snapshot_lock():
+        return await take_snapshot_copy()
+
+def find_snapshot_copies():
+    """Snapshot copies of the game database left on disk"""
+    base = os.path.splitext(ORIGINAL_DB)[0]
+    return glob.glob(f"{glob.escape(base)}_*_temp.db")
+
+def remove_snapshot_copies():
+    """Delete the snapshot copies when the bot exits, they are full size copies of the save"""
+    for path in find_snapshot_copies():
+        try:
+            os.remove(path)
+            logger.info("Removed temporary database: %s", path)
+        except OSError as e:
+            logger.warning("Error removing temporary database %s: %s", path, e)
+
+atexit.register(remove_snapshot_copies)
+
+async def prewarm_snapshot():
+    """Take the first snapshot and fill the caches before anyone asks"""
+    started = time.perf_counter()
+    try:
+        # Remove copies left behind by a previous run, holding the lock so a command
+        # arriving meanwhile can't take a copy under a name that is about to be deleted
+        async with get_snapshot_lock():
+            for leftover in find_snapshot_copies():
+                if leftover != snapshot["path"]:
+                    await cleanup_temp_db(leftover)
+        
+        await get_snapshot()
+        logger.info("Prewarm finished in %.2fs (generation %d)",
+                    time.perf_counter() - started, snapshot["generation"])
+    except Exception as e:
+        logger.error("Error during prewarm: %s", e)
+
+async def get_snapshot_report(snap, name, build, record_type=None):
+    """Build a report from the snapshot on first use and reuse it for the rest of the generation
+    
+    Reports made of record_type records are also kept in the sidecar cache.
+    Only the claim on the report and the copy are made under the snapshot lock,
+    the build itself runs outside it so only callers of this report wait for it.
+    """
+    owner = False
+    report = None
+    temp_db = None
+    async with get_snapshot_lock():
+        reports = snap["reports"]
+        pending = reports.get(name)
+        if pending is None:
+            # Claim the report for this generation, later callers wait on the same future
+            owner = True
+            pending = asyncio.get_running_loop().create_future()
+            reports[name] = pending
+            fingerprint = snap["fingerprint"]
+            generation = snap["generation"]
+            try:
+                if record_type is not None:
+                    rows = await asyncio.to_thread(load_cached_report, name, fingerprint)
+                    if rows is not None:
+                        report = [record_type.from_row(row) for row in rows]
+                if report is None:
+                    temp_db = await take_snapshot_copy()
+                    # Keep the copy on disk until the build below is done with it
+                    copy_readers[temp_db] = copy_readers.get(temp_db, 0) + 1
+            except BaseException:
+                del reports[name]
+                pending.set_result(None)
+                raise
+    
+    if not owner:
+        # Built, or still being built, by another command
+        add_command_cost(COST_CACHE_HIT)
+        return await asyncio.shield(pending)
+    
+    if temp_db is None:
+        add_command_cost(COST_CACHE_HIT)
+        pending.set_result(report)
+        return report
+    
+    add_command_cost(COST_QUERY)
+    started = time.perf_counter()
+    try:
+        report = await asyncio.to_thread(build, temp_db)
+        logger.info("Built %s in %.2fs (generation %d)",
+                    name, time.perf_counter() - started, generation)
+        if record_type is not None and report is not None:
+            rows = [record.to_row() for record in report]
+            await asyncio.to_thread(save_cached_report, name, fingerprint, rows)
+    finally:
+        copy_readers[temp_db] -= 1
+        if not copy_readers[temp_db]:
+            del copy_readers[temp_db]
+        # A failed build isn't kept, so the next call tries again
+        if report is None and reports.get(name) is pending:
+            del reports[name]
+        pending.set_result(report)
+    return report
+
+async def wait_for_snapshot(ctx):
+    """Get the current snapshot, letting the user know if the prewarm is still running"""
+    if prewarm_task is not None and not prewarm_task.done():
+        await ctx.send("Bot is still warming up its cache, your results will follow shortly...")
+    async with ctx.typing():
+        return await get_snapshot()
+
+async def lookup_structure_count(snap, clan_name):
+    """Structure count for a clan, answered from the cache when possible"""
+    caches = snap["caches"]
+    if caches is None:
+        add_command_cost(COST_QUERY)
+        return await get_structure_count(await get_snapshot_path(), clan_name)
+    
+    add_command_cost(COST_CACHE_HIT)
+    guild = caches["guilds"].get(clan_name)
+    if guild is None:
+        logger.info("No guild found with name: %s", clan_name)
+        return None
+    return guild.structure_count
+
+async def lookup_clan_members(snap, clan_name):
+    """Clan roster, answered from the cache when possible"""
+    caches = snap["caches"]
+    if caches is None:
+        add_command_cost(COST_QUERY)
+        return await get_clan_members(await get_snapshot_path(), clan_name)
+    
+    add_command_cost(COST_CACHE_HIT)
+    guild = caches["guilds"].get(clan_name)
+    if guild is None:
+        logger.info("No guild found with name: %s", clan_name)
+        return None
+    return caches["rosters"].get(guild.id, [])
+
+async def lookup_player_info(snap, player_name):
+    """Player details, skipping the database when no cached name matches"""
+    caches = snap["caches"]
+    # LIKE wildcards can't be checked against the name cache
+    if caches is not None and "%" not in player_name and "_" not in player_name:
+        needle = player_name.lower()
+        if needle not in caches["names"]:
+            add_command_cost(COST_CACHE_HIT)
+            return None
+    add_command_cost(COST_QUERY)
+    return await get_player_info(await get_snapshot_path(), player_name)
+
+#-------------------------
+# Item Index Functions
+#-------------------------
+def build_item_index(db_path):
+    """Aggregate item_inventory by template and holder in a single scan"""
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT guildId, name FROM guilds")
+        guild_names = dict(cursor.fetchall())
+        
+        cursor.execute("SELECT id, char_name, guild FROM characters")
+        characters = {char_id: (char_name, guild) for char_id, char_name, guild in cursor.fetchall()}
+        
+        # Items in chests, thralls and other placeables belong to the owner of that object
+        cursor.execute("""
+            SELECT ii.template_id, COALESCE(b.owner_id, ii.owner_id) AS holder, COUNT(*)
+            FROM item_inventory ii
+            LEFT JOIN buildings b ON b.object_id = ii.owner_id
+            GROUP BY ii.template_id, holder
+            ORDER BY ii.template_id, 3 DESC
+        """)
+        
+        # Holders per template, stored column-wise and sorted by template ID
+        template_ids = array("q")
+        template_starts = array("q")
+        holder_ids = array("q")
+        holder_counts = array("q")
+        clan_totals = {}
+        
+        for template_id, holder, count in cursor:
+            if not template_ids or template_ids[-1] != template_id:
+                template_ids.append(template_id)
+                template_starts.append(len(holder_ids))
+            holder_ids.append(holder)
+            holder_counts.append(count)
+            
+            # Roll characters up to their clan
+            clan_id = holder if holder in guild_names else characters.get(holder, (None, None))[1]
+            if clan_id is not None:
+                key = (clan_id, template_id)
+                clan_totals[key] = clan_totals.get(key, 0) + count
+        template_starts.append(len(holder_ids))
+        
+        # Templates per clan, sorted by clan ID and then by count
+        clan_ids = array("q")
+        clan_starts = array("q")
+        clan_template_ids = array("q")
+        clan_counts = array("q")
+        for (clan_id, template_id), count in sorted(clan_totals.items(), key=lambda x: (x[0][0], -x[1])):
+            if not clan_ids or clan_ids[-1] != clan_id:
+                clan_ids.append(clan_id)
+                clan_starts.append(len(clan_template_ids))
+            clan_template_ids.append(template_id)
+            clan_counts.append(count)
+        clan_starts.append(len(clan_template_ids))
+        
+        return {
+            "guild_names": guild_names,
+            "characters": characters,
+            "template_ids": template_ids,
+            "template_starts": template_starts,
+            "holder_ids": holder_ids,
+            "holder_counts": holder_counts,
+            "clan_ids": clan_ids,
+            "clan_starts": clan_starts,
+            "clan_template_ids": clan_template_ids,
+            "clan_counts": clan_counts
+        }
+    except Exception as e:
+        logger.error("Error in build_item_index: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+async def get_item_index(snap):
+    """Item index for the current snapshot, scanning the inventory once per generation"""
+    # The arrays are cheap to rebuild and aren't kept in the sidecar cache
+    return await get_snapshot_report(snap, "item index", build_item_index)
+
+def find_in_columns(keys, starts, key):
+    """Slice bounds for a key in a column-wise index, or None if it's missing"""
+    pos = bisect_left(keys, key)
+    if pos == len(keys) or keys[pos] != key:
+        return None
+    return starts[pos], starts[pos + 1]
+
+def describe_holder(index, holder_id):
+    """Display name and kind of an item holder"""
+    if holder_id in index["guild_names"]:
+        return index["guild_names"][holder_id] or "Unknown", "Clan"
+    if holder_id in index["characters"]:
+        char_name, guild_id = index["characters"][holder_id]
+        clan_name = index["guild_names"].get(guild_id) if guild_id is not None else None
+        return (f"{char_name} [{clan_name}]" if clan_name else char_name), "Player"
+    return f"#{holder_id}", "Orphan"
+
+def get_item_holders(index, template_id, limit=25):
+    """Top holders of an item template as (name, kind, count), plus the total held"""
+    bounds = find_in_columns(index["template_ids"], index["template_starts"], template_id)
+    if bounds is None:
+        return [], 0
+    start, end = bounds
+    total = sum(index["holder_counts"][start:end])
+    holders = []
+    for i in range(start, min(end, start + limit)):
+        name, kind = describe_holder(index, index["holder_ids"][i])
+        holders.append((name, kind, index["holder_counts"][i]))
+    return holders, total
+
+def get_clan_top_items(index, clan_id, limit=25):
+    """Most held item templates for a clan as (template_id, count)"""
+    bounds = find_in_columns(index["clan_ids"], index["clan_starts"], clan_id)
+    if bounds is None:
+        return []
+    start, end = bounds
+    return [(index["clan_template_ids"][i], index["clan_counts"][i])
+            for i in range(start, min(end, start + limit))]
+
+#-------------------------
+# Census Functions
+#-------------------------
+def build_census(db_path):
+    """Count followers and placeables per owner in one grouped pass"""
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # Owned objects without building pieces are followers (thralls, pets) or placeables
+        cursor.execute("""
+            SELECT 
+                o.owner_id,
+                g.name,
+                c.char_name,
+                o.followers,
+                o.placeables
+            FROM (
+                SELECT 
+                    b.owner_id,
+                    SUM(CASE WHEN ap.class LIKE '%/Characters/%' THEN 1 ELSE 0 END) AS followers,
+                    SUM(CASE WHEN ap.class LIKE '%/Characters/%' THEN 0 ELSE 1 END) AS placeables
+                FROM buildings b
+                JOIN actor_position ap ON ap.id = b.object_id
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM building_instances bi WHERE bi.object_id = b.object_id
+                )
+                GROUP BY b.owner_id
+            ) o
+            LEFT JOIN guilds g ON g.guildId = o.owner_id
+            LEFT JOIN characters c ON c.id = o.owner_id
+            ORDER BY o.followers + o.placeables DESC
+        """)
+        
+        results = []
+        for owner_id, guild_name, char_name, followers, placeables in cursor.fetchall():
+            if guild_name is not None:
+                name, kind = intern_name(guild_name), "Clan"
+            elif char_name is not None:
+                name, kind = char_name, "Player"
+            else:
+                name, kind = f"#{owner_id}", "Orphan"
+            
+            results.append(ActorLoadRecord(owner_id, kind, name, followers, placeables))
+        
+        return results
+    except Exception as e:
+        logger.error("Error in build_census: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+async def get_census(snap):
+    """Follower and placeable census for the current snapshot"""
+    return await get_snapshot_report(snap, "census", build_census, ActorLoadRecord)
+
 #-------------------------
 # Player Teleport Functions
 #-------------------------
@@ -86,7 +872,7 @@ async def get_online_player_positions(db_path):
         # First, get all online accounts with their IDs
         cursor.execute("SELECT id, user FROM account WHERE online = 1")
         online_accounts = cursor.fetchall()
-        print(f"Found {len(online_accounts)} online accounts")
+        logger.info("Found %d online accounts", len(online_accounts))
         
         results = []
         # For each online account, check if there's a character with matching ID
@@ -122,7 +908,7 @@ async def get_online_player_positions(db_path):
         
         return results
     except Exception as e:
-        print(f"Error in get_online_player_positions: {e}")
+        logger.error("Error in get_online_player_positions: %s", e)
         return []
     finally:
         if conn:
@@ -143,10 +929,10 @@ async def get_all_characters_with_positions(db_path):
         cursor.execute(query)
         results = cursor.fetchall()
         
-        print(f"Found {len(results)} characters with positions")
+        logger.info("Found %d characters with positions", len(results))
         return results
     except Exception as e:
-        print(f"Error in get_all_characters_with_positions: {e}")
+        logger.error("Error in get_all_characters_with_positions: %s", e)
         return []
     finally:
         if conn:
@@ -179,10 +965,10 @@ async def get_structure_count(db_path, clan_name):
         cursor.execute("SELECT guildId FROM guilds WHERE name = ?", (clan_name,))
         guild_result = cursor.fetchone()
         if guild_result is None:
-            print(f"No guild found with name: {clan_name}")
+            logger.info("No guild found with name: %s", clan_name)
             return None
         guild_id = guild_result[0]
-        print(f"Found guild ID: {guild_id} for clan: {clan_name}")
+        logger.debug("Found guild ID: %s for clan: %s", guild_id, clan_name)
 
         # Count building instances associated with the guild's buildings
         cursor.execute("""
@@ -192,25 +978,25 @@ async def get_structure_count(db_path, clan_name):
             WHERE b.owner_id = ?
         """, (guild_id,))
         structure_count = cursor.fetchone()[0]
-        print(f"Total structures (building instances) for guild ID {guild_id}: {structure_count}")
+        logger.info("Total structures (building instances) for guild ID %s: %d", guild_id, structure_count)
 
-        # Count different types of structures
-        cursor.execute("""
-            SELECT bi.class, COUNT(*)
-            FROM building_instances bi
-            JOIN buildings b ON bi.object_id = b.object_id
-            WHERE b.owner_id = ?
-            GROUP BY bi.class
-        """, (guild_id,))
-        structure_types = cursor.fetchall()
-        for structure_type, count in structure_types:
-            print(f"  {structure_type.split('.')[-1]}: {count}")
+        # Count different types of structures (only logged, so skip the query unless debugging)
+        if logger.isEnabledFor(logging.DEBUG):
+            cursor.execute("""
+                SELECT bi.class, COUNT(*)
+                FROM building_instances bi
+                JOIN buildings b ON bi.object_id = b.object_id
+                WHERE b.owner_id = ?
+                GROUP BY bi.class
+            """, (guild_id,))
+            structure_types = cursor.fetchall()
+            # One record for the whole breakdown, so sampling can't drop part of it
+            logger.debug("Structure breakdown for guild ID %s: %s", guild_id,
+                         ", ".join(f"{structure_type.split('.')[-1]}: {count}" for structure_type, count in structure_types))
 
         return structure_count
     except Exception as e:
-        print(f"Error in get_structure_count: {e}")
-        print(f"Clan name: {clan_name}")
-        print(f"Database path: {db_path}")
+        logger.error("Error in get_structure_count: %s (clan name: %s, database path: %s)", e, clan_name, db_path)
         return None
     finally:
         if conn:
@@ -226,7 +1012,7 @@ async def get_clan_members(db_path, clan_name):
         cursor.execute("SELECT guildId FROM guilds WHERE name = ?", (clan_name,))
         guild_result = cursor.fetchone()
         if guild_result is None:
-            print(f"No guild found with name: {clan_name}")
+            logger.info("No guild found with name: %s", clan_name)
             return None
         guild_id = guild_result[0]
         
@@ -270,41 +1056,127 @@ async def get_clan_members(db_path, clan_name):
                 if online_result:
                     online = online_result[0]
             
-            results.append((char_name, level, rank, bool(online)))
+            results.append(CharacterRecord(char_id, char_name, level, rank, guild_id, bool(online)))
         
         return results
     except Exception as e:
-        print(f"Error in get_clan_members: {e}")
-        print(f"Clan name: {clan_name}")
-        print(f"Database path: {db_path}")
+        logger.error("Error in get_clan_members: %s (clan name: %s, database path: %s)", e, clan_name, db_path)
         return None
     finally:
         if conn:
             conn.close()
 
-async def get_all_clan_structures(db_path):
+def build_owner_report(db_path):
+    """Resolve every structure owner to a clan, character or orphan in one grouped pass"""
     conn = None
     try:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
+        # Every building owner plus every clan, so clans without structures still show up
         cursor.execute("""
-            SELECT g.name, COUNT(bi.instance_id)
-            FROM guilds g
-            JOIN buildings b ON g.guildId = b.owner_id
-            JOIN building_instances bi ON b.object_id = bi.object_id
-            GROUP BY g.guildId
+            WITH pieces AS (
+                SELECT b.owner_id, COUNT(bi.instance_id) AS piece_count
+                FROM buildings b
+                JOIN building_instances bi ON b.object_id = bi.object_id
+                GROUP BY b.owner_id
+            ),
+            members AS (
+                SELECT guild, MAX(lastTimeOnline) AS last_active, COUNT(*) AS member_count, char_name
+                FROM characters
+                WHERE guild IS NOT NULL
+                GROUP BY guild
+            ),
+            owners AS (
+                SELECT owner_id FROM pieces
+                UNION
+                SELECT guildId FROM guilds
+            )
+            SELECT 
+                o.owner_id,
+                COALESCE(p.piece_count, 0),
+                g.guildId,
+                g.name,
+                m.last_active,
+                m.member_count,
+                m.char_name,
+                c.id,
+                c.char_name,
+                c.lastTimeOnline
+            FROM owners o
+            LEFT JOIN pieces p ON p.owner_id = o.owner_id
+            LEFT JOIN guilds g ON g.guildId = o.owner_id
+            LEFT JOIN members m ON m.guild = o.owner_id
+            LEFT JOIN characters c ON c.id = o.owner_id
         """)
-        clan_structures = cursor.fetchall()
         
-        return clan_structures
+        results = []
+        for row in cursor.fetchall():
+            (owner_id, piece_count, guild_id, guild_name, guild_last_active, member_count,
+             guild_last_member, char_id, char_name, char_last_active) = row
+            
+            # MAX(lastTimeOnline) picks char_name from the most recently active member
+            if guild_id is not None:
+                kind, name = "Clan", intern_name(guild_name)
+                last_active, last_member = guild_last_active, guild_last_member
+                member_count = member_count or 0
+            elif char_id is not None:
+                kind, name = "Player", char_name
+                last_active, last_member = char_last_active, char_name
+                member_count = 1
+            else:
+                kind, name = "Orphan", f"#{owner_id}"
+                last_active, last_member, member_count = None, None, 0
+            
+            results.append(OwnerRecord(owner_id, kind, name, piece_count, last_active,
+                                       member_count, last_member or "Unknown"))
+        
+        return results
     except Exception as e:
-        print(f"Error in get_all_clan_structures: {e}")
-        return []
+        logger.error("Error in build_owner_report: %s", e)
+        return None
     finally:
         if conn:
             conn.close()
 
+async def get_owner_report(snap):
+    """Structure owners for the current snapshot"""
+    return await get_snapshot_report(snap, "owner report", build_owner_report, OwnerRecord)
+
+def get_owner_structures(owners):
+    """Owners with structures as (name, kind, count), largest first"""
+    results = [(owner.name or "Unknown", owner.kind, owner.structure_count)
+               for owner in owners if owner.structure_count > 0]
+    results.sort(key=lambda x: x[2], reverse=True)
+    return results
+
+def get_inactive_owners(owners, days_inactive):
+    """Owners whose most recent activity is at least the specified days ago, as (owner, days) pairs"""
+    current_time = int(time.time())
+    cutoff_time = current_time - (days_inactive * 24 * 60 * 60)
+    
+    results = []
+    for owner in owners:
+        latest_activity = owner.last_active
+        
+        if latest_activity:
+            if latest_activity >= cutoff_time:
+                continue
+            last_active_date = datetime.fromtimestamp(latest_activity)
+            days_since = (datetime.now() - last_active_date).days
+        elif owner.structure_count > 0:
+            # No one left who could log in, the structures are abandoned
+            days_since = None
+        else:
+            continue
+        
+        results.append((owner, days_since))
+    
+    # Sort by most inactive first, owners with no activity at all on top
+    results.sort(key=lambda x: float("inf") if x[1] is None else x[1], reverse=True)
+    
+    return results
+
 async def get_player_info(db_path, player_name):
     """Get detailed information about a player"""
     conn = None
@@ -390,123 +1262,93 @@ async def get_player_info(db_path, player_name):
             # Convert epoch time to readable format
             last_seen = datetime.fromtimestamp(last_time) if last_time else None
             
-            player_info = {
-                "name": char_name,
-                "level": level,
-                "rank": rank,
-                "guild": guild_name,
-                "online": bool(online),
-                "alive": bool(is_alive),
-                "killer": killer_name if killer_name else None,
-                "last_seen": last_seen,
-                "position": position,
-                "stats": stats
-            }
+            player_info = PlayerRecord(
+                char_name,
+                level,
+                rank,
+                guild_name,
+                bool(online),
+                bool(is_alive),
+                killer_name if killer_name else None,
+                last_seen,
+                position,
+                stats
+            )
             
             results.append(player_info)
         
         return results
     except Exception as e:
-        print(f"Error in get_player_info: {e}")
+        logger.error("Error in get_player_info: %s", e)
         return None
     finally:
         if conn:
             conn.close()
 
-async def get_inactive_clans(db_path, days_inactive):
-    """Get clans where all members have been inactive for at least the specified days"""
-    conn = None
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Calculate the cutoff timestamp
-        current_time = int(time.time())
-        cutoff_time = current_time - (days_inactive * 24 * 60 * 60)
-        
-        # First get all valid clans
-        cursor.execute("SELECT guildId, name FROM guilds")
-        guilds = cursor.fetchall()
-        
-        results = []
-        
-        # Process each guild individually
-        for guild_id, guild_name in guilds:
-            # Get the most recent character activity in this clan
-            cursor.execute("""
-                SELECT MAX(lastTimeOnline), COUNT(*) 
-                FROM characters 
-                WHERE guild = ?
-            """, (guild_id,))
-            result = cursor.fetchone()
-            latest_activity, member_count = result
-            
-            # Only include clans that have been inactive for the specified days
-            if latest_activity and latest_activity < cutoff_time:
-                # Count structures
-                cursor.execute("""
-                    SELECT COUNT(*)
-                    FROM building_instances bi
-                    JOIN buildings b ON bi.object_id = b.object_id
-                    WHERE b.owner_id = ?
-                """, (guild_id,))
-                structure_count = cursor.fetchone()[0]
-                
-                # Get the most recently active character in this clan
-                cursor.execute("""
-                    SELECT char_name, lastTimeOnline
-                    FROM characters
-                    WHERE guild = ?
-                    ORDER BY lastTimeOnline DESC
-                    LIMIT 1
-                """, (guild_id,))
-                
-                recent_char = cursor.fetchone()
-                recent_char_name = recent_char[0] if recent_char else "Unknown"
-                
-                # Convert timestamp to datetime and calculate days
-                last_active_date = datetime.fromtimestamp(latest_activity)
-                days_since = (datetime.now() - last_active_date).days
-                
-                clan_info = {
-                    "id": guild_id,
-                    "name": guild_name,
-                    "last_active": last_active_date,
-                    "days_inactive": days_since,
-                    "member_count": member_count,
-                    "structure_count": structure_count,
-                    "last_active_member": recent_char_name
-                }
-                
-                results.append(clan_info)
-        
-        # Sort by most inactive first
-        results.sort(key=lambda x: x["days_inactive"], reverse=True)
-        
-        return results
-    except Exception as e:
-        print(f"Error in get_inactive_clans: {e}")
-        return []
-    finally:
-        if conn:
-            conn.close()
-
 #-------------------------
 # Helper Functions
 #-------------------------
-def check_cooldown(user_id, minutes=5):
-    current_time = datetime.now()
+def add_command_cost(cost):
+    """Add to the cost charged for the command currently running"""
+    command_cost.set(command_cost.get() + cost)
+
+def rate_limit_budget(member):
+    """Token capacity and refill rate (tokens per minute) for a member"""
+    capacity = RATE_LIMIT_TOKENS
+    if ALLOWED_ROLE_IDS and any(role.id in ALLOWED_ROLE_IDS for role in getattr(member, "roles", [])):
+        capacity *= ROLE_RATE_LIMIT_MULTIPLIER
+    # A full bucket refills over one cooldown period
+    return capacity, capacity / max(COMMAND_COOLDOWN, 1)
+
+def refill_bucket(member):
+    """Top up a member's bucket for the time since it was last used"""
+    capacity, rate = rate_limit_budget(member)
+    now = time.monotonic()
+    tokens, last_refill = rate_buckets.get(member.id, (capacity, now))
+    tokens = min(capacity, tokens + (now - last_refill) / 60 * rate)
+    rate_buckets[member.id] = [tokens, now]
+    return tokens, rate
+
+def sweep_rate_buckets():
+    """Drop buckets that have been idle long enough to be full again"""
+    global last_bucket_sweep
+    now = time.monotonic()
+    if now - last_bucket_sweep < 60:
+        return
+    last_bucket_sweep = now
     
-    if user_id in last_used:
-        time_diff = current_time - last_used[user_id]
-        if time_diff < timedelta(minutes=minutes):
-            remaining = minutes - (time_diff.total_seconds() / 60)
-            return False, remaining
+    # The largest possible debt refills within this many seconds
+    capacity = RATE_LIMIT_TOKENS * max(ROLE_RATE_LIMIT_MULTIPLIER, 1)
+    ttl = (capacity + COST_SNAPSHOT + COST_QUERY) / (RATE_LIMIT_TOKENS / max(COMMAND_COOLDOWN, 1)) * 60
+    for user_id, (tokens, last_refill) in list(rate_buckets.items()):
+        if now - last_refill >= ttl:
+            del rate_buckets[user_id]
+
+def check_rate_limit(member):
+    """Check whether a member has enough tokens left to run a command
     
-    # Set cooldown
-    last_used[user_id] = current_time
+    The minimum cost is reserved straight away, so commands started at the same
+    time can't all get in on the same tokens before any of them is charged.
+    """
+    sweep_rate_buckets()
+    tokens, rate = refill_bucket(member)
+    if tokens < COST_CACHE_HIT:
+        remaining = (COST_CACHE_HIT - tokens) / rate
+        return False, remaining
+    rate_buckets[member.id][0] = tokens - COST_CACHE_HIT
+    command_reserved.set(COST_CACHE_HIT)
     return True, 0
 
+def charge_rate_limit(member, cost):
+    """Charge a member for the work their command actually did, less what was reserved"""
+    cost -= command_reserved.get()
+    if cost == 0:
+        return
+    capacity, _ = rate_limit_budget(member)
+    tokens, _ = refill_bucket(member)
+    # Buckets may go into debt so an expensive command delays the next one
+    rate_buckets[member.id][0] = min(capacity, tokens - cost)
+
 def has_allowed_role():
     async def predicate(ctx):
         if not ALLOWED_ROLE_IDS:  # If no roles specified, deny all
@@ -514,12 +1356,124 @@ def has_allowed_role():
         return any(role.id in ALLOWED_ROLE_IDS for role in ctx.author.roles)
     return commands.check(predicate)
 
+#-------------------------
+# Paginated Views
+#-------------------------
+class ReportView(discord.ui.View):
+    """Shows one page of a report at a time, with buttons to page through and re-sort it
+    
+    rows must already be in the order of the first entry in sorts, a list of
+    (label, key, reverse). Other orders are sorted on first use and kept in
+    sort_cache, which can be shared by every view of the same report.
+    """
+    def __init__(self, author_id, title, header, rows, format_row, sorts, page_size,
+                 generation, sort_cache=None):
+        super().__init__(timeout=300)
+        self.author_id = author_id
+        self.title = title
+        self.header = header
+        self.format_row = format_row
+        self.sorts = sorts
+        self.page_size = page_size
+        self.generation = generation
+        self.sort_cache = sort_cache if sort_cache is not None else {}
+        self.sort_cache.setdefault(sorts[0][0], rows)
+        self.sort_index = 0
+        self.page = 0
+        self.message = None
+        self.update_buttons()
+    
+    @property
+    def rows(self):
+        label, key, reverse = self.sorts[self.sort_index]
+        if label not in self.sort_cache:
+            self.sort_cache[label] = sorted(self.sort_cache[self.sorts[0][0]], key=key, reverse=reverse)
+        return self.sort_cache[label]
+    
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.rows) // self.page_size))
+    
+    def render(self):
+        """Text of the current page"""
+        start = self.page * self.page_size
+        lines = [self.format_row(i, row) for i, row in enumerate(self.rows[start:start + self.page_size], start)]
+        footer = (f"Page {self.page + 1}/{self.page_count} - {len(self.rows)} results - "
+                  f"sorted by {self.sorts[self.sort_index][0]} - snapshot {self.generation}")
+        return f"```\n{self.title}\n\n{self.header}{''.join(lines)}\n{footer}\n```"
+    
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+        self.change_sort.label = f"Sort: {self.sorts[(self.sort_index + 1) % len(self.sorts)][0]}"
+        self.change_sort.disabled = len(self.sorts) < 2
+    
+    async def send(self, ctx):
+        """Send the first page, with buttons only if there is more than one page"""
+        if self.page_count == 1:
+            await ctx.send(self.render())
+            return
+        self.message = await ctx.send(self.render(), view=self)
+    
+    async def interaction_check(self, interaction):
+        # Only the admin who ran the command can page through it
+        return interaction.user.id == self.author_id
+    
+    async def show_page(self, interaction):
+        self.update_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+    
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+    
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        self.page = max(self.page - 1, 0)
+        await self.show_page(interaction)
+    
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        self.page = min(self.page + 1, self.page_count - 1)
+        await self.show_page(interaction)
+    
+    @discord.ui.button(label="Sort", style=discord.ButtonStyle.primary)
+    async def change_sort(self, interaction, button):
+        self.sort_index = (self.sort_index + 1) % len(self.sorts)
+        self.page = 0
+        await self.show_page(interaction)
+
 #-------------------------
 # Bot Events
 #-------------------------
 @bot.event
 async def on_ready():
-    print(f'Bot is ready! Logged in as {bot.user}')
+    global prewarm_task
+    logger.info("Bot is ready! Logged in as %s", bot.user)
+    
+    # on_ready fires again on reconnects, only report and prewarm once
+    if prewarm_task is None:
+        steps = ", ".join(f"{step} {elapsed * 1000:.1f}ms" for step, elapsed in startup_timings.items())
+        logger.info("Time to ready: %.2fs (%s)", time.perf_counter() - STARTUP_STARTED, steps)
+        prewarm_task = asyncio.create_task(prewarm_snapshot())
+
+@bot.before_invoke
+async def before_command(ctx):
+    command_cost.set(0.0)
+    command_reserved.set(0.0)
+    correlation_id.set(str(ctx.message.id))
+    command_started.set(time.perf_counter())
+    logger.info("Command !%s from %s (%s)", ctx.command.name, ctx.author, ctx.author.id)
+
+@bot.after_invoke
+async def after_command(ctx):
+    cost = command_cost.get()
+    charge_rate_limit(ctx.author, cost)
+    logger.info("Command !%s finished in %.2fs (cost %.1f)",
+                ctx.command.name, time.perf_counter() - command_started.get(), cost)
 
 #-------------------------
 # Bot Commands
@@ -531,72 +1485,63 @@ async def teleport_list(ctx):
         await ctx.send("This command can only be used in the designated channel.")
         return
     
-    # Check cooldown
-    can_use, remaining = check_cooldown(ctx.author.id, COMMAND_COOLDOWN)
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
     if not can_use:
         await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
         return
     
     await ctx.send("Fetching online player positions...")
     
-    # Create temporary database
-    temp_db = await create_temp_db(ORIGINAL_DB)
+    await wait_for_snapshot(ctx)
     
-    try:
-        # Get positions
-        results = await get_online_player_positions(temp_db)
-        
-        if not results:
-            results = await get_all_characters_with_positions(temp_db)
-        
-        # Format results
-        formatted = format_positions(results)
-        
-        # Split into chunks if too long (Discord has 2000 char limit)
-        if len(formatted) <= 1990:
-            await ctx.send(f"```\n{formatted}\n```")
-        else:
-            chunks = [formatted[i:i+1990] for i in range(0, len(formatted), 1990)]
-            for i, chunk in enumerate(chunks):
-                await ctx.send(f"```\n{chunk}\n```")
-                if i < len(chunks) - 1:
-                    await asyncio.sleep(1)  # Avoid rate limits
+    # Get positions
+    add_command_cost(COST_QUERY)
+    temp_db = await get_snapshot_path()
+    results = await get_online_player_positions(temp_db)
     
-    finally:
-        # Clean up temp database
-        await cleanup_temp_db(temp_db)
+    if not results:
+        results = await get_all_characters_with_positions(temp_db)
+    
+    # Format results
+    formatted = format_positions(results)
+    
+    # Split into chunks if too long (Discord has 2000 char limit)
+    if len(formatted) <= 1990:
+        await ctx.send(f"```\n{formatted}\n```")
+    else:
+        chunks = [formatted[i:i+1990] for i in range(0, len(formatted), 1990)]
+        for i, chunk in enumerate(chunks):
+            await ctx.send(f"```\n{chunk}\n```")
+            if i < len(chunks) - 1:
+                await asyncio.sleep(1)  # Avoid rate limits
 
 @bot.command()
 async def structures(ctx, *, clan_name: str):
     if STRUCTURES_CHANNEL_ID != 0 and ctx.channel.id != STRUCTURES_CHANNEL_ID:
         return
     
-    # Check cooldown
-    can_use, remaining = check_cooldown(ctx.author.id, COMMAND_COOLDOWN)
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
     if not can_use:
         await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
         return
     
-    print(f"Retrieving structure count for clan: {clan_name}")
+    logger.info("Retrieving structure count for clan: %s", clan_name)
     await ctx.send(f"Checking structure count for '{clan_name}'...")
     
-    # Create temporary database
-    temp_db = await create_temp_db(ORIGINAL_DB)
+    snap = await wait_for_snapshot(ctx)
     
-    try:
-        structure_count = await get_structure_count(temp_db, clan_name)
-        if structure_count is not None:
-            message = f"```\nClan '{clan_name}' has {structure_count} structures"
-            if structure_count > MAX_STRUCTURES:
-                over_limit = structure_count - MAX_STRUCTURES
-                message += f" (⚠️ {over_limit} over limit!)"
-            message += "\n```"
-            await ctx.send(message)
-        else:
-            await ctx.send(f"```\nAn error occurred or clan '{clan_name}' was not found.\n```")
-    finally:
-        # Clean up temp database
-        await cleanup_temp_db(temp_db)
+    structure_count = await lookup_structure_count(snap, clan_name)
+    if structure_count is not None:
+        message = f"```\nClan '{clan_name}' has {structure_count} structures"
+        if structure_count > MAX_STRUCTURES:
+            over_limit = structure_count - MAX_STRUCTURES
+            message += f" (⚠️ {over_limit} over limit!)"
+        message += "\n```"
+        await ctx.send(message)
+    else:
+        await ctx.send(f"```\nAn error occurred or clan '{clan_name}' was not found.\n```")
 
 @bot.command()
 @has_allowed_role()
@@ -604,254 +1549,409 @@ async def allclanstructures(ctx):
     if STRUCTURES_CHANNEL_ID != 0 and ctx.channel.id != STRUCTURES_CHANNEL_ID:
         return
     
-    # Check cooldown
-    can_use, remaining = check_cooldown(ctx.author.id, COMMAND_COOLDOWN)
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
     if not can_use:
         await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
         return
     
     await ctx.send("Fetching clan structure counts...")
     
-    # Create temporary database
-    temp_db = await create_temp_db(ORIGINAL_DB)
+    snap = await wait_for_snapshot(ctx)
     
-    try:
-        clan_structures = await get_all_clan_structures(temp_db)
-        if clan_structures:
-            message = "Clan Structure Counts:\n"
-            for clan, count in clan_structures:
-                message += f"{clan}: {count} structures"
-                if count > MAX_STRUCTURES:
-                    over_limit = count - MAX_STRUCTURES
-                    message += f" (⚠️ {over_limit} over limit!)"
-                message += "\n"
-            
-            # Split into chunks if too long (Discord has 2000 char limit)
-            if len(message) <= 1990:
-                await ctx.send(f"```\n{message}\n```")
+    owners = await get_owner_report(snap)
+    
+    # Sorted orders are shared by every view of this generation
+    sort_cache = snap["reports"].setdefault("allclanstructures pages", {})
+    clan_structures = sort_cache.get("structures")
+    if clan_structures is None:
+        clan_structures = get_owner_structures(owners) if owners else []
+    
+    if clan_structures:
+        def format_row(i, row):
+            clan, kind, count = row
+            # Solo players and orphaned owners are tagged so they stand out from clans
+            if kind == "Clan":
+                line = f"{clan}: {count} structures"
             else:
-                chunks = [message[i:i+1990] for i in range(0, len(message), 1990)]
-                for i, chunk in enumerate(chunks):
-                    await ctx.send(f"```\n{chunk}\n```")
-                    if i < len(chunks) - 1:
-                        await asyncio.sleep(1)  # Avoid rate limits
-        else:
-            await ctx.send("No clan structure data found.")
-    finally:
-        # Clean up temp database
-        await cleanup_temp_db(temp_db)
+                line = f"{clan} [{kind}]: {count} structures"
+            if count > MAX_STRUCTURES:
+                over_limit = count - MAX_STRUCTURES
+                line += f" (⚠️ {over_limit} over limit!)"
+            return line + "\n"
+        
+        view = ReportView(
+            ctx.author.id,
+            "Clan Structure Counts:",
+            "",
+            clan_structures,
+            format_row,
+            [("structures", None, False),
+             ("name", lambda row: row[0].lower(), False),
+             ("type", lambda row: (row[1], -row[2]), False)],
+            20,
+            snap["generation"],
+            sort_cache
+        )
+        await view.send(ctx)
+    else:
+        await ctx.send("No clan structure data found.")
 
 @bot.command()
 async def clan(ctx, *, clan_name: str):
     if STRUCTURES_CHANNEL_ID != 0 and ctx.channel.id != STRUCTURES_CHANNEL_ID:
         return
     
-    # Check cooldown
-    can_use, remaining = check_cooldown(ctx.author.id, COMMAND_COOLDOWN)
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
     if not can_use:
         await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
         return
     
-    print(f"Retrieving members for clan: {clan_name}")
+    logger.info("Retrieving members for clan: %s", clan_name)
     await ctx.send(f"Looking up members in clan '{clan_name}'...")
     
-    # Create temporary database
-    temp_db = await create_temp_db(ORIGINAL_DB)
+    snap = await wait_for_snapshot(ctx)
     
-    try:
-        members = await get_clan_members(temp_db, clan_name)
-        if members is not None and len(members) > 0:
-            message = f"Members in clan '{clan_name}':\n\n"
-            message += "Name                 Level   Rank        Status\n"
-            message += "------------------------------------------------\n"
-            
-            rank_names = {
-                0: "Recruit",
-                1: "Member",
-                2: "Officer",
-                3: "Leader",
-                None: "-"
-            }
+    members = await lookup_clan_members(snap, clan_name)
+    if members is not None and len(members) > 0:
+        message = f"Members in clan '{clan_name}':\n\n"
+        message += "Name                 Level   Rank        Status\n"
+        message += "------------------------------------------------\n"
+        
+        rank_names = {
+            0: "Recruit",
+            1: "Member",
+            2: "Officer",
+            3: "Leader",
+            None: "-"
+        }
+        
+        for member in members:
+            level = member.level if member.level is not None else "?"
+            rank_name = rank_names.get(member.rank, f"Unknown({member.rank})")
+            status = "🟢 Online" if member.online else "⚫ Offline"
             
-            for member in members:
-                name, level, rank_num, is_online = member
-                level = level if level is not None else "?"
-                rank_name = rank_names.get(rank_num, f"Unknown({rank_num})")
-                status = "🟢 Online" if is_online else "⚫ Offline"
-                
-                # Pad fields for alignment
-                padded_name = name.ljust(20)
-                padded_level = str(level).ljust(7)
-                padded_rank = rank_name.ljust(11)
-                
-                message += f"{padded_name} {padded_level} {padded_rank} {status}\n"
+            # Pad fields for alignment
+            padded_name = member.name.ljust(20)
+            padded_level = str(level).ljust(7)
+            padded_rank = rank_name.ljust(11)
             
-            # Split into chunks if too long (Discord has 2000 char limit)
-            if len(message) <= 1990:
-                await ctx.send(f"```\n{message}\n```")
-            else:
-                chunks = [message[i:i+1990] for i in range(0, len(message), 1990)]
-                for i, chunk in enumerate(chunks):
-                    await ctx.send(f"```\n{chunk}\n```")
-                    if i < len(chunks) - 1:
-                        await asyncio.sleep(1)  # Avoid rate limits
+            message += f"{padded_name} {padded_level} {padded_rank} {status}\n"
+        
+        # Split into chunks if too long (Discord has 2000 char limit)
+        if len(message) <= 1990:
+            await ctx.send(f"```\n{message}\n```")
         else:
-            await ctx.send(f"```\nNo members found for clan '{clan_name}' or clan does not exist.\n```")
-    finally:
-        # Clean up temp database
-        await cleanup_temp_db(temp_db)
+            chunks = [message[i:i+1990] for i in range(0, len(message), 1990)]
+            for i, chunk in enumerate(chunks):
+                await ctx.send(f"```\n{chunk}\n```")
+                if i < len(chunks) - 1:
+                    await asyncio.sleep(1)  # Avoid rate limits
+    else:
+        await ctx.send(f"```\nNo members found for clan '{clan_name}' or clan does not exist.\n```")
 
 @bot.command()
 async def player(ctx, *, player_name: str):
     if STRUCTURES_CHANNEL_ID != 0 and ctx.channel.id != STRUCTURES_CHANNEL_ID:
         return
         
-    # Check cooldown
-    can_use, remaining = check_cooldown(ctx.author.id, COMMAND_COOLDOWN)
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
     if not can_use:
         await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
         return
     
-    print(f"Looking up player: {player_name}")
+    logger.info("Looking up player: %s", player_name)
     await ctx.send(f"Searching for player '{player_name}'...")
     
-    # Create temporary database
-    temp_db = await create_temp_db(ORIGINAL_DB)
+    snap = await wait_for_snapshot(ctx)
     
-    try:
-        player_results = await get_player_info(temp_db, player_name)
-        
-        if not player_results:
-            await ctx.send(f"```\nNo players found matching '{player_name}'.\n```")
-            return
-            
-        # Convert rank numbers to names for display
-        rank_names = {
-            0: "Recruit",
-            1: "Member",
-            2: "Officer",
-            3: "Leader",
-            None: "-"
-        }
+    player_results = await lookup_player_info(snap, player_name)
+    
+    if not player_results:
+        await ctx.send(f"```\nNo players found matching '{player_name}'.\n```")
+        return
         
-        # If we found multiple matches, display them all
-        if len(player_results) > 1:
-            message = f"Found {len(player_results)} players matching '{player_name}':\n\n"
+    # Convert rank numbers to names for display
+    rank_names = {
+        0: "Recruit",
+        1: "Member",
+        2: "Officer",
+        3: "Leader",
+        None: "-"
+    }
+    
+    # If we found multiple matches, page through them
+    if len(player_results) > 1:
+        def format_row(i, player):
+            status = "🟢 Online" if player.online else "⚫ Offline"
+            if not player.alive:
+                status = "💀 Dead"
             
-            for i, player in enumerate(player_results):
-                status = "🟢 Online" if player["online"] else "⚫ Offline"
-                if not player["alive"]:
-                    status = "💀 Dead"
-                
-                clan = player["guild"] if player["guild"] else "No Clan"
-                
-                message += f"{i+1}. {player['name']} (Level {player['level']}) - {clan} - {status}\n"
+            clan = player.guild if player.guild else "No Clan"
             
-            await ctx.send(f"```\n{message}\n```")
-            return
-        
-        # If we have exactly one player, show detailed info
-        player = player_results[0]
+            return f"{i+1}. {player.name} (Level {player.level}) - {clan} - {status}\n"
         
-        message = f"Player Information: {player['name']}\n"
-        message += "═════════════════════════════\n"
-        
-        # Status information
-        status = "🟢 Online" if player["online"] else "⚫ Offline"
-        if not player["alive"]:
-            status = f"💀 Dead (Killed by: {player['killer'] or 'Unknown'})"
-        message += f"Status: {status}\n"
+        view = ReportView(
+            ctx.author.id,
+            f"Found {len(player_results)} players matching '{player_name}':",
+            "",
+            player_results,
+            format_row,
+            [("match", None, False),
+             ("name", lambda player: player.name.lower(), False),
+             ("level", lambda player: player.level or 0, True),
+             ("online", lambda player: (not player.online, player.name.lower()), False)],
+            15,
+            snap["generation"]
+        )
+        await view.send(ctx)
+        return
+    
+    # If we have exactly one player, show detailed info
+    player = player_results[0]
+    
+    message = f"Player Information: {player.name}\n"
+    message += "═════════════════════════════\n"
+    
+    # Status information
+    status = "🟢 Online" if player.online else "⚫ Offline"
+    if not player.alive:
+        status = f"💀 Dead (Killed by: {player.killer or 'Unknown'})"
+    message += f"Status: {status}\n"
+    
+    # Basic info
+    message += f"Level: {player.level}\n"
+    
+    # Clan info
+    if player.guild:
+        rank_name = rank_names.get(player.rank, f"Unknown({player.rank})")
+        message += f"Clan: {player.guild} ({rank_name})\n"
+    else:
+        message += "Clan: None\n"
+    
+    # Last seen
+    if player.last_seen and not player.online:
+        message += f"Last Seen: {player.last_seen.strftime('%Y-%m-%d %H:%M:%S')}\n"
+    
+    # Position if available
+    if player.position:
+        x, y, z = player.position
+        message += f"\nCurrent Location:\n"
+        message += f"X: {round(x, 2)}, Y: {round(y, 2)}, Z: {round(z, 2)}\n"
+        message += f"Teleport: TeleportPlayer {round(x, 2)} {round(y, 2)} {round(z+100, 2)}\n"
+    
+    # Send the message
+    await ctx.send(f"```\n{message}\n```")
+
+@bot.command()
+@has_allowed_role()
+async def oldclans(ctx):
+    if STRUCTURES_CHANNEL_ID != 0 and ctx.channel.id != STRUCTURES_CHANNEL_ID:
+        return
+    
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
+    if not can_use:
+        await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
+        return
+    
+    await ctx.send(f"Searching for clans and players inactive for {INACTIVE_DAYS}+ days...")
+    
+    snap = await wait_for_snapshot(ctx)
+    
+    owners = await get_owner_report(snap)
+    inactive_clans = get_inactive_owners(owners, INACTIVE_DAYS) if owners else []
+    
+    if not inactive_clans:
+        await ctx.send(f"```\nNo clans or players found that have been inactive for {INACTIVE_DAYS}+ days.\n```")
+        return
         
-        # Basic info
-        message += f"Level: {player['level']}\n"
+    header = "Owner Name                   Type     Days     Members  Structures  Last Active Member\n"
+    header += "-------------------------------------------------------------------------------------\n"
+    
+    def format_row(i, row):
+        clan, days_inactive = row
+        name = clan.name or "Unknown"
+        kind = clan.kind
+        days = days_inactive if days_inactive is not None else "-"
+        members = clan.member_count
+        structures = clan.structure_count if clan.structure_count is not None else 0
+        last_member = clan.last_active_member
         
-        # Clan info
-        if player["guild"]:
-            rank_name = rank_names.get(player["rank"], f"Unknown({player['rank']})")
-            message += f"Clan: {player['guild']} ({rank_name})\n"
+        # Truncate or pad clan name for alignment
+        if len(name) > 28:
+            name = name[:25] + "..."
         else:
-            message += "Clan: None\n"
+            name = name.ljust(28)
+            
+        # Format type and days
+        kind_str = kind.ljust(8)
+        days_str = str(days).ljust(8)
         
-        # Last seen
-        if player["last_seen"] and not player["online"]:
-            message += f"Last Seen: {player['last_seen'].strftime('%Y-%m-%d %H:%M:%S')}\n"
+        # Format members and structures
+        members_str = str(members).ljust(8)
+        structures_str = str(structures).ljust(11)
         
-        # Position if available
-        if player["position"]:
-            x, y, z = player["position"]
-            message += f"\nCurrent Location:\n"
-            message += f"X: {round(x, 2)}, Y: {round(y, 2)}, Z: {round(z, 2)}\n"
-            message += f"Teleport: TeleportPlayer {round(x, 2)} {round(y, 2)} {round(z+100, 2)}\n"
+        return f"{name} {kind_str} {days_str} {members_str} {structures_str} {last_member}\n"
+    
+    view = ReportView(
+        ctx.author.id,
+        f"Clans and Players Inactive for {INACTIVE_DAYS}+ Days:",
+        header,
+        inactive_clans,
+        format_row,
+        [("days inactive", None, False),
+         ("structures", lambda row: row[0].structure_count or 0, True),
+         ("name", lambda row: (row[0].name or "").lower(), False),
+         ("type", lambda row: row[0].kind, False)],
+        15,
+        snap["generation"]
+    )
+    await view.send(ctx)
+
+@bot.command()
+@has_allowed_role()
+async def finditem(ctx, template_id: int):
+    if STRUCTURES_CHANNEL_ID != 0 and ctx.channel.id != STRUCTURES_CHANNEL_ID:
+        return
+    
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
+    if not can_use:
+        await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
+        return
+    
+    await ctx.send(f"Searching for holders of item {template_id}...")
+    
+    snap = await wait_for_snapshot(ctx)
+    
+    index = await get_item_index(snap)
+    if index is None:
+        await ctx.send("```\nAn error occurred while reading the item inventory.\n```")
+        return
+    
+    holders, total = get_item_holders(index, template_id)
+    if not holders:
+        await ctx.send(f"```\nNo one is holding item {template_id}.\n```")
+        return
+    
+    message = f"Holders of item {template_id} ({total} stacks in total):\n\n"
+    message += "Holder                         Type     Stacks\n"
+    message += "----------------------------------------------\n"
+    
+    for name, kind, count in holders:
+        # Truncate or pad holder name for alignment
+        if len(name) > 30:
+            name = name[:27] + "..."
+        else:
+            name = name.ljust(30)
         
-        # Send the message
+        message += f"{name} {kind.ljust(8)} {count}\n"
+    
+    # Split into chunks if too long (Discord has 2000 char limit)
+    if len(message) <= 1990:
         await ctx.send(f"```\n{message}\n```")
-        
-    finally:
-        # Clean up temp database
-        await cleanup_temp_db(temp_db)
+    else:
+        chunks = [message[i:i+1990] for i in range(0, len(message), 1990)]
+        for i, chunk in enumerate(chunks):
+            await ctx.send(f"```\n{chunk}\n```")
+            if i < len(chunks) - 1:
+                await asyncio.sleep(1)  # Avoid rate limits
 
 @bot.command()
 @has_allowed_role()
-async def oldclans(ctx):
+async def topitems(ctx, *, clan_name: str):
     if STRUCTURES_CHANNEL_ID != 0 and ctx.channel.id != STRUCTURES_CHANNEL_ID:
         return
     
-    # Check cooldown
-    can_use, remaining = check_cooldown(ctx.author.id, COMMAND_COOLDOWN)
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
     if not can_use:
         await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
         return
     
-    await ctx.send(f"Searching for clans inactive for {INACTIVE_DAYS}+ days...")
+    await ctx.send(f"Looking up the most held items for clan '{clan_name}'...")
     
-    # Create temporary database
-    temp_db = await create_temp_db(ORIGINAL_DB)
+    snap = await wait_for_snapshot(ctx)
     
-    try:
-        inactive_clans = await get_inactive_clans(temp_db, INACTIVE_DAYS)
-        
-        if not inactive_clans:
-            await ctx.send(f"```\nNo clans found that have been inactive for {INACTIVE_DAYS}+ days.\n```")
-            return
-            
-        message = f"Clans Inactive for {INACTIVE_DAYS}+ Days:\n\n"
-        message += "Clan Name                    Days     Members  Structures  Last Active Member\n"
-        message += "----------------------------------------------------------------------------\n"
-        
-        for clan in inactive_clans:
-            name = clan["name"] or "Unknown"
-            days = clan["days_inactive"]
-            members = clan["member_count"]
-            structures = clan["structure_count"] if clan["structure_count"] is not None else 0
-            last_member = clan["last_active_member"]
-            
-            # Truncate or pad clan name for alignment
-            if len(name) > 28:
-                name = name[:25] + "..."
-            else:
-                name = name.ljust(28)
-                
-            # Format days
-            days_str = str(days).ljust(8)
-            
-            # Format members and structures
-            members_str = str(members).ljust(8)
-            structures_str = str(structures).ljust(11)
-            
-            message += f"{name} {days_str} {members_str} {structures_str} {last_member}\n"
+    index = await get_item_index(snap)
+    if index is None:
+        await ctx.send("```\nAn error occurred while reading the item inventory.\n```")
+        return
+    
+    clan_id = next((guild_id for guild_id, name in index["guild_names"].items() if name == clan_name), None)
+    if clan_id is None:
+        await ctx.send(f"```\nClan '{clan_name}' was not found.\n```")
+        return
+    
+    top_items = get_clan_top_items(index, clan_id)
+    if not top_items:
+        await ctx.send(f"```\nClan '{clan_name}' is not holding any items.\n```")
+        return
+    
+    message = f"Most held items for clan '{clan_name}':\n\n"
+    message += "Template ID    Stacks\n"
+    message += "---------------------\n"
+    for template_id, count in top_items:
+        message += f"{str(template_id).ljust(14)} {count}\n"
+    
+    await ctx.send(f"```\n{message}\n```")
+
+@bot.command()
+@has_allowed_role()
+async def census(ctx):
+    if STRUCTURES_CHANNEL_ID != 0 and ctx.channel.id != STRUCTURES_CHANNEL_ID:
+        return
+    
+    # Check rate limit
+    can_use, remaining = check_rate_limit(ctx.author)
+    if not can_use:
+        await ctx.send(f"Command on cooldown. Try again in {remaining:.1f} minutes.")
+        return
+    
+    await ctx.send("Counting followers and placeables...")
+    
+    snap = await wait_for_snapshot(ctx)
+    
+    owners = await get_census(snap)
+    if not owners:
+        await ctx.send("```\nNo follower or placeable data found.\n```")
+        return
+    
+    total_followers = sum(owner.followers for owner in owners)
+    total_placeables = sum(owner.placeables for owner in owners)
+    
+    message = f"Server Load Census ({total_followers} followers, {total_placeables} placeables):\n\n"
+    message += "Owner                        Type     Followers  Placeables  Total\n"
+    message += "------------------------------------------------------------------\n"
+    
+    # Heaviest owners first
+    for owner in owners[:25]:
+        name = owner.name or "Unknown"
         
-        # Split into chunks if too long (Discord has 2000 char limit)
-        if len(message) <= 1990:
-            await ctx.send(f"```\n{message}\n```")
+        # Truncate or pad owner name for alignment
+        if len(name) > 28:
+            name = name[:25] + "..."
         else:
-            chunks = [message[i:i+1990] for i in range(0, len(message), 1990)]
-            for i, chunk in enumerate(chunks):
-                await ctx.send(f"```\n{chunk}\n```")
-                if i < len(chunks) - 1:
-                    await asyncio.sleep(1)  # Avoid rate limits
-    finally:
-        # Clean up temp database
-        await cleanup_temp_db(temp_db)
+            name = name.ljust(28)
+        
+        followers_str = str(owner.followers).ljust(10)
+        placeables_str = str(owner.placeables).ljust(11)
+        total = owner.followers + owner.placeables
+        
+        message += f"{name} {owner.kind.ljust(8)} {followers_str} {placeables_str} {total}\n"
+    
+    # Split into chunks if too long (Discord has 2000 char limit)
+    if len(message) <= 1990:
+        await ctx.send(f"```\n{message}\n```")
+    else:
+        chunks = [message[i:i+1990] for i in range(0, len(message), 1990)]
+        for i, chunk in enumerate(chunks):
+            await ctx.send(f"```\n{chunk}\n```")
+            if i < len(chunks) - 1:
+                await asyncio.sleep(1)  # Avoid rate limits
 
 @allclanstructures.error
 async def allclanstructures_error(ctx, error):
@@ -863,9 +1963,29 @@ async def oldclans_error(ctx, error):
     if isinstance(error, commands.CheckFailure):
         await ctx.send("You don't have permission to use this command.")
 
+@finditem.error
+async def finditem_error(ctx, error):
+    if isinstance(error, commands.CheckFailure):
+        await ctx.send("You don't have permission to use this command.")
+    elif isinstance(error, commands.UserInputError):
+        await ctx.send("Usage: !finditem <template id>")
+
+@topitems.error
+async def topitems_error(ctx, error):
+    if isinstance(error, commands.CheckFailure):
+        await ctx.send("You don't have permission to use this command.")
+    elif isinstance(error, commands.UserInputError):
+        await ctx.send("Usage: !topitems <clan name>")
+
+@census.error
+async def census_error(ctx, error):
+    if isinstance(error, commands.CheckFailure):
+        await ctx.send("You don't have permission to use this command.")
+
 # Run bot with token from config
 if __name__ == "__main__":
     try:
-        bot.run(config.get("DISCORD", "APIKEY"))
+        # discord.py logs through the same queue as the bot instead of its own handler
+        bot.run(config.get("DISCORD", "APIKEY"), log_handler=None)
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error("An error occurred: %s", e)
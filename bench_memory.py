@@ -0,0 +1,120 @@
+"""Measure the memory AdminBot keeps for its caches on a synthetic save
+
+Usage: python bench_memory.py [path to AdminBot.py] [characters]
+
+Builds a fake game.db with the tables AdminBot reads, then uses tracemalloc
+to measure what stays allocated after building the snapshot caches, the
+owner report and the census. Results are printed and written to
+bench_output.txt. Pass an older AdminBot.py (e.g. from git show) to compare.
+"""
+import gc
+import importlib.util
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+def build_save(path, characters):
+    """Write a synthetic save with clans, solo players, orphaned buildings, thralls and chests"""
+    random.seed(1)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE guilds(guildId INTEGER PRIMARY KEY, name TEXT, owner INTEGER);
+        CREATE TABLE characters(id INTEGER PRIMARY KEY, char_name TEXT, level INT, rank INT, guild INT,
+                                isAlive INT, killerName TEXT, lastTimeOnline INT, lastServerTimeOnline REAL,
+                                playerId TEXT);
+        CREATE TABLE account(id INTEGER PRIMARY KEY, user TEXT, online INT);
+        CREATE TABLE actor_position(class TEXT, id INTEGER PRIMARY KEY, map TEXT, x REAL, y REAL, z REAL);
+        CREATE TABLE buildings(object_id INTEGER PRIMARY KEY, owner_id INTEGER);
+        CREATE TABLE building_instances(object_id INT, instance_id INT, class TEXT, worldTrans TEXT);
+        CREATE TABLE character_stats(char_id INT, stat_type INT, stat_id INT, stat_value REAL);
+        CREATE TABLE item_inventory(item_id INT, owner_id INT, inv_type INT, template_id INT, data BLOB,
+                                    PRIMARY KEY(item_id, owner_id, inv_type));
+        CREATE INDEX building_instances_object ON building_instances(object_id, instance_id);
+        CREATE INDEX characters_guild ON characters(guild);
+    """)
+
+    now = int(time.time())
+    guild_count = max(characters // 5, 2)
+    conn.executemany("INSERT INTO guilds VALUES (?, ?, 0)",
+                     ((g, f"Clan{g}") for g in range(1, guild_count + 1)))
+
+    for i in range(1, characters + 1):
+        char_id = 1000 + i
+        # One in four characters is a solo player
+        guild = random.randint(1, guild_count) if i % 4 else None
+        conn.execute("INSERT INTO account VALUES (?, ?, ?)", (i, f"user{i}", 1 if i % 7 == 0 else 0))
+        conn.execute("INSERT INTO characters VALUES (?, ?, ?, ?, ?, 1, NULL, ?, 0, ?)",
+                     (char_id, f"Player_{i}", random.randint(1, 60), random.randint(0, 3) if guild else None,
+                      guild, now - random.randint(0, 90) * 86400, str(i)))
+        conn.execute("INSERT INTO actor_position VALUES ('/Game/Characters/Player', ?, 'm', 1, 2, 3)", (char_id,))
+        conn.executemany("INSERT INTO item_inventory VALUES (?, ?, 0, ?, x'00')",
+                         ((slot, char_id, random.choice([10001, 10002, 11001, 12000])) for slot in range(5)))
+
+    # Clans, every third character and one owner that no longer exists
+    owners = list(range(1, guild_count + 1)) + [1000 + i for i in range(1, characters + 1, 3)] + [999999]
+    object_id = 100000
+    for owner in owners:
+        for _ in range(random.randint(1, 4)):
+            object_id += 1
+            conn.execute("INSERT INTO buildings VALUES (?, ?)", (object_id, owner))
+            kind = random.random()
+            if kind < 0.6:
+                conn.executemany("INSERT INTO building_instances VALUES (?, ?, '/Game/Build/Foundation.Foundation_C', '')",
+                                 ((object_id, inst) for inst in range(random.randint(1, 30))))
+                actor_class = "/Game/Systems/Building/BuildFoundation"
+            elif kind < 0.8:
+                actor_class = "/Game/Characters/NPCs/Humanoid/BP_NPC_Thrall.BP_NPC_Thrall_C"
+            else:
+                actor_class = "/Game/Systems/Building/Placeables/BP_PL_Chest.BP_PL_Chest_C"
+            conn.execute("INSERT INTO actor_position VALUES (?, ?, 'm', 0, 0, 0)", (actor_class, object_id))
+            conn.execute("INSERT INTO item_inventory VALUES (0, ?, 4, 10001, x'00')", (object_id,))
+
+    conn.commit()
+    conn.close()
+
+def retained(build):
+    """Bytes still allocated once build() has returned, while its result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+def main():
+    bot_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "AdminBot.py")
+    characters = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    spec = importlib.util.spec_from_file_location("AdminBot", bot_path)
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "game.db")
+        build_save(db_path, characters)
+
+        results = {}
+        kept = []
+        for name, build in (("caches", bot.build_caches),
+                            ("owner report", bot.build_owner_report),
+                            ("census", bot.build_census)):
+            result, size = retained(lambda: build(db_path))
+            kept.append(result)
+            results[name] = size
+
+    total = sum(results.values())
+    lines = [f"{bot_path}: {characters} characters"]
+    lines += [f"  {name}: {size} bytes ({size / characters:.0f} per character)" for name, size in results.items()]
+    lines.append(f"  total: {total} bytes ({total / characters:.0f} per character)")
+    report = "\n".join(lines)
+    print(report)
+    with open("bench_output.txt", "a", encoding="utf-8") as f:
+        f.write(report + "\n")
+
+if __name__ == "__main__":
+    main()